@@ -0,0 +1,239 @@
+"""
+Asynchronous Gmail client fetching messages concurrently over HTTP/2.
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from google.auth.transport.requests import Request
+
+from auth import HTTP_TIMEOUT, orjson
+from cache import MessageCache
+from gmail_client import (
+    LIST_FIELDS, LIST_PAGE_SIZE, MAX_RETRIES, RETRY_STATUSES,
+    MessageParser, ParsedMessage, backoff_delay
+)
+
+try:
+    import httpx
+except ImportError:
+    # Optional dependency (pip install "httpx[http2]")
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# Gmail REST endpoint for the authenticated user
+API_ROOT = 'https://gmail.googleapis.com/gmail/v1/users/me'
+
+# Maximum number of requests in flight at once
+MAX_CONCURRENCY = 25
+
+
+class AsyncGmailClient(MessageParser):
+    """
+    Gmail client that issues message fetches concurrently.
+
+    Requests are multiplexed over a single HTTP/2 connection, so fetching
+    N messages costs roughly one round-trip instead of N. This does not
+    depend on the Gmail batch endpoint. Parsing is shared with
+    GmailClient through MessageParser.
+
+    Use as an async context manager, or call aclose() when done.
+    """
+
+    def __init__(self, credentials, cache: Optional[MessageCache] = None):
+        """
+        Initialize async Gmail client.
+
+        Args:
+            credentials: Authorized Google OAuth2 credentials
+            cache: Optional MessageCache for reusing fetched messages
+        """
+        if httpx is None:
+            raise ImportError(
+                "AsyncGmailClient requires httpx. "
+                "Install it with: pip install \"httpx[http2]\""
+            )
+        self.cache = cache
+        self.credentials = credentials
+        self._client = httpx.AsyncClient(
+            base_url=API_ROOT,
+            http2=True,
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=20)
+        )
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+        self._refresh_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the underlying HTTP connection pool."""
+        await self._client.aclose()
+
+    async def _auth_headers(self) -> Dict[str, str]:
+        """
+        Build the Authorization header, refreshing the token if needed.
+
+        The refresh is a blocking HTTP call, so it runs in a worker thread
+        rather than stalling the event loop, and only once for all the
+        requests waiting on it.
+
+        Returns:
+            Request headers
+        """
+        if not self.credentials.valid:
+            async with self._refresh_lock:
+                if not self.credentials.valid:
+                    await asyncio.to_thread(self.credentials.refresh, Request())
+        return {'Authorization': f"Bearer {self.credentials.token}"}
+
+    async def _get(self, path: str, params: Dict) -> Dict:
+        """
+        GET a Gmail API resource, retrying with exponential backoff.
+
+        Args:
+            path: Resource path relative to API_ROOT
+            params: Query parameters
+
+        Returns:
+            Decoded JSON response
+        """
+        for attempt in range(MAX_RETRIES):
+            try:
+                async with self._semaphore:
+                    response = await self._client.get(
+                        path,
+                        params=params,
+                        headers=await self._auth_headers()
+                    )
+            except httpx.TransportError as e:
+                # Timeouts and dropped connections are retried like 429s
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                reason = repr(e)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES - 1:
+                    break
+                reason = f"HTTP {response.status_code}"
+            delay = backoff_delay(attempt)
+            logger.warning("Request failed with %s, retrying in %.1fs", reason, delay)
+            await asyncio.sleep(delay)
+
+        response.raise_for_status()
+        if orjson is not None:
+            return orjson.loads(response.content)
+        return response.json()
+
+    async def list_messages_async(
+        self,
+        max_results: int = 10,
+        query: str = '',
+        metadata_only: bool = False
+    ) -> List[ParsedMessage]:
+        """
+        List messages from inbox, fetching them all concurrently.
+
+        Args:
+            max_results: Maximum number of messages to retrieve
+            query: Gmail search query (optional)
+            metadata_only: Fetch headers and snippet only, without bodies
+
+        Returns:
+            List of parsed messages with full details
+        """
+        try:
+            msg_ids = []
+            page_token = None
+            while len(msg_ids) < max_results:
+                params = {
+                    'maxResults': min(max_results - len(msg_ids), LIST_PAGE_SIZE),
+                    'q': query,
+                    'fields': LIST_FIELDS
+                }
+                if page_token:
+                    params['pageToken'] = page_token
+
+                results = await self._get('/messages', params)
+                msg_ids.extend(msg['id'] for msg in results.get('messages', []))
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+
+            messages = await asyncio.gather(*[
+                self.get_message_async(msg_id, metadata_only)
+                for msg_id in msg_ids[:max_results]
+            ])
+            return [msg for msg in messages if msg]
+
+        except httpx.HTTPError as e:
+            logger.error("Error listing messages: %s", e)
+            return []
+
+    async def get_message_async(
+        self,
+        msg_id: str,
+        metadata_only: bool = False,
+        fields: Optional[str] = None
+    ) -> Optional[ParsedMessage]:
+        """
+        Get full message details.
+
+        Args:
+            msg_id: Message ID
+            metadata_only: Fetch headers and snippet only, without bodies
+            fields: Partial-response mask overriding the default
+
+        Returns:
+            Parsed message details
+        """
+        try:
+            params = self._get_params(metadata_only, fields)
+
+            message = self._cached_response(msg_id, params)
+            if message is None:
+                message = await self._get(f"/messages/{msg_id}", params)
+                self._store_response(msg_id, params, message)
+
+            parsed = self._parse_message(message, metadata_only)
+            await self._fetch_inline_images(msg_id, parsed.inline_images)
+            return parsed
+
+        except httpx.HTTPError as e:
+            logger.error("Error getting message %s: %s", msg_id, e)
+            return None
+
+    async def _fetch_inline_images(self, msg_id: str, inline_images: Dict[str, Dict]):
+        """
+        Fill in data for inline images stored as separate attachments.
+
+        Images that cannot be fetched are reported and keep data None.
+
+        Args:
+            msg_id: Message ID
+            inline_images: Inline images from _get_inline_images, updated in place
+        """
+        async def fetch(cid):
+            key = self._attachment_key(msg_id, cid)
+            attachment = None
+            if self.cache is not None:
+                attachment = self.cache.get(key, 'attachment')
+            if attachment is None:
+                try:
+                    attachment = await self._get(
+                        f"/messages/{msg_id}/attachments/{inline_images[cid]['attachment_id']}",
+                        {}
+                    )
+                except httpx.HTTPError as e:
+                    # Skip this image only; the message is still returned
+                    logger.error("Inline image %s of message %s could not be fetched: %s", cid, msg_id, e)
+                    return
+                if self.cache is not None:
+                    self.cache.set(key, 'attachment', attachment)
+            inline_images[cid]['data'] = attachment['data']
+
+        await asyncio.gather(*[fetch(cid) for cid in self._pending_inline_images(inline_images)])
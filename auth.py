@@ -1,37 +1,137 @@
 """
 OAuth2 authentication for Gmail API.
 """
+import functools
 import os
-import pickle
+from datetime import datetime, timedelta, timezone
+import google_auth_httplib2
+import httplib2
 from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.model import JsonModel
+
+try:
+    # Optional faster JSON parser (pip install orjson)
+    import orjson
+except ImportError:
+    orjson = None
 
 # Gmail API scopes
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 
-def get_gmail_service():
+# Refresh access tokens that expire within this window
+REFRESH_MARGIN = timedelta(minutes=5)
+
+# Socket timeout in seconds for Gmail API connections
+HTTP_TIMEOUT = 60
+
+# Gmail services built by get_service, per credentials. A plain dict:
+# each service's transport references its credentials, so weak keys would
+# never be dropped anyway. Entries last for the process.
+_services = {}
+
+
+def build_http(creds):
     """
-    Authenticate and return Gmail API service.
+    Create an authorized HTTP transport for Gmail API requests.
+
+    The underlying httplib2.Http keeps its TLS connection to Google open
+    between requests, so every request made through one transport reuses
+    the same connection. httplib2 is not thread-safe: each thread needs
+    its own transport.
+
+    Args:
+        creds: Google OAuth2 credentials
+
+    Returns:
+        google_auth_httplib2.AuthorizedHttp
+    """
+    return google_auth_httplib2.AuthorizedHttp(
+        creds,
+        http=httplib2.Http(timeout=HTTP_TIMEOUT)
+    )
+
+
+class OrjsonModel(JsonModel):
+    """
+    JsonModel that parses API responses with orjson.
+
+    Full message responses carry base64 bodies and run to hundreds of
+    KB, where orjson parses several times faster than the json module.
+    """
+
+    def deserialize(self, content):
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # Let JsonModel handle non-JSON bodies the way it always has
+            return super().deserialize(content)
+
+
+def _expires_soon(creds) -> bool:
+    """
+    Check whether credentials expire within REFRESH_MARGIN.
+
+    Args:
+        creds: Google OAuth2 credentials
+
+    Returns:
+        True if the access token should be refreshed now
+    """
+    if not creds.expiry:
+        return False
+    # google-auth stores expiry as a naive UTC datetime
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return creds.expiry - now < REFRESH_MARGIN
+
+
+def _save_credentials(creds, token_path: str):
+    """
+    Atomically write credentials to the token file.
+
+    Writing to a temporary file and renaming it means a concurrent CLI
+    run never reads a partially written token.
+
+    Args:
+        creds: Google OAuth2 credentials
+        token_path: Path of the token file
+    """
+    tmp_path = f"{token_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as token:
+        token.write(creds.to_json())
+    os.replace(tmp_path, token_path)
+
+
+@functools.lru_cache(maxsize=1)
+def get_credentials():
+    """
+    Load, refresh or obtain OAuth2 credentials for Gmail.
 
     Uses environment variables GOOGLE_OAUTH2_CLIENT_ID and
     GOOGLE_OAUTH2_CLIENT_SECRET if set, otherwise falls back
     to credentials.json file.
 
+    Credentials are loaded once per process and reused by later calls.
+
     Returns:
-        googleapiclient.discovery.Resource: Authenticated Gmail service
+        google.oauth2.credentials.Credentials: Authorized credentials
     """
     creds = None
     token_path = 'token.json'
 
     # Check if we have saved credentials
     if os.path.exists(token_path):
-        with open(token_path, 'rb') as token:
-            creds = pickle.load(token)
+        try:
+            creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+        except ValueError:
+            # Unreadable or old pickle-format token; authenticate again
+            creds = None
 
-    # If credentials don't exist or are invalid, authenticate
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
+    # Authenticate unless the saved access token is good for a while yet
+    if not creds or not creds.valid or _expires_soon(creds):
+        if creds and creds.refresh_token:
             creds.refresh(Request())
         else:
             # Check for environment variables first
@@ -68,7 +168,60 @@ def get_gmail_service():
             creds = flow.run_local_server(port=0)
 
         # Save credentials for future use
-        with open(token_path, 'wb') as token:
-            pickle.dump(creds, token)
+        _save_credentials(creds, token_path)
+
+    return creds
+
+
+def get_gmail_service():
+    """
+    Authenticate and return Gmail API service.
+
+    The service is built once per process and reused by later calls.
+
+    Returns:
+        googleapiclient.discovery.Resource: Authenticated Gmail service
+    """
+    return get_service(get_credentials())
+
 
-    return build('gmail', 'v1', credentials=creds)
+def get_service(creds):
+    """
+    Return the Gmail API service for credentials, building it once.
+
+    Services are memoized per credentials object for the life of the
+    process, so every client for the same account shares one keep-alive
+    connection.
+
+    Args:
+        creds: Google OAuth2 credentials
+
+    Returns:
+        googleapiclient.discovery.Resource: Authenticated Gmail service
+    """
+    service = _services.get(creds)
+    if service is None:
+        service = build_service(creds)
+        _services[creds] = service
+    return service
+
+
+def build_service(creds):
+    """
+    Build a Gmail API service on a keep-alive authorized transport.
+
+    Args:
+        creds: Google OAuth2 credentials
+
+    Returns:
+        googleapiclient.discovery.Resource: Authenticated Gmail service
+    """
+    # Use the discovery document bundled with googleapiclient rather
+    # than fetching (or caching) it over HTTPS
+    return build(
+        'gmail', 'v1',
+        http=build_http(creds),
+        model=OrjsonModel() if orjson is not None else None,
+        static_discovery=True,
+        cache_discovery=False
+    )
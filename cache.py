@@ -0,0 +1,120 @@
+"""
+Local cache of Gmail API message responses.
+"""
+import gzip
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+# Default cache database, stored next to token.json
+CACHE_PATH = '.gmail_cache.db'
+
+
+class MessageCache:
+    """
+    SQLite-backed cache of messages().get() responses.
+
+    Delivered Gmail messages never change, so a response fetched once for
+    a given message ID and format can be reused on every later run.
+    Responses are stored as gzip-compressed JSON.
+    """
+
+    def __init__(self, path: str = CACHE_PATH):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: Path of the SQLite database file
+        """
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS messages ('
+                'key TEXT PRIMARY KEY, data BLOB NOT NULL)'
+            )
+
+    @staticmethod
+    def _key(msg_id: str, fmt: str) -> str:
+        return f"{msg_id}:{fmt}"
+
+    def get(self, msg_id: str, fmt: str) -> Optional[Dict]:
+        """
+        Look up a cached API response.
+
+        Args:
+            msg_id: Message ID
+            fmt: Message format the response was fetched with
+
+        Returns:
+            Cached API response, or None if not cached
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data FROM messages WHERE key = ?',
+                (self._key(msg_id, fmt),)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return json.loads(gzip.decompress(row[0]))
+
+    def get_many(self, msg_ids: Iterable[str], fmt: str) -> Dict[str, Dict]:
+        """
+        Look up several cached API responses at once.
+
+        Args:
+            msg_ids: Message IDs
+            fmt: Message format the responses were fetched with
+
+        Returns:
+            Dictionary mapping message ID to cached API response for the
+            IDs found in the cache
+        """
+        keys = {self._key(msg_id, fmt): msg_id for msg_id in msg_ids}
+        key_list = list(keys)
+        rows = []
+
+        with self._lock:
+            # Stay well under SQLite's limit on bound parameters
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows.extend(self._conn.execute(
+                    f'SELECT key, data FROM messages WHERE key IN ({placeholders})',
+                    chunk
+                ).fetchall())
+
+        return {keys[key]: json.loads(gzip.decompress(data)) for key, data in rows}
+
+    def set_many(self, fmt: str, responses: Iterable[Tuple[str, Dict]]):
+        """
+        Store API responses in a single transaction.
+
+        Args:
+            fmt: Message format the responses were fetched with
+            responses: (message ID, API response) pairs
+        """
+        rows = [
+            (self._key(msg_id, fmt), gzip.compress(json.dumps(response).encode('utf-8')))
+            for msg_id, response in responses
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO messages (key, data) VALUES (?, ?)',
+                rows
+            )
+
+    def set(self, msg_id: str, fmt: str, response: Dict):
+        """
+        Store one API response.
+
+        Args:
+            msg_id: Message ID
+            fmt: Message format the response was fetched with
+            response: API response to cache
+        """
+        self.set_many(fmt, [(msg_id, response)])
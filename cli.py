@@ -2,43 +2,61 @@
 """
 Gmail Tools - Command-line interface for Gmail operations.
 """
+import functools
+import logging
+
 import click
-from auth import get_gmail_service
+from auth import get_credentials
+from cache import MessageCache
 from gmail_client import GmailClient
 from filters import EmailFilter
 from exporters import EmailExporter
 
 
+@functools.lru_cache(maxsize=2)
+def get_client(use_cache: bool = True):
+    """Return the GmailClient shared by all commands in this process."""
+    cache = MessageCache() if use_cache else None
+    return GmailClient.from_credentials(get_credentials(), cache=cache)
+
+
 @click.group()
 def cli():
     """Gmail Tools - Manage your Gmail from the command line."""
-    pass
+    logging.basicConfig(format='%(levelname)s: %(message)s')
 
 
 @cli.command()
 @click.option('--max-results', '-n', default=10, help='Number of emails to fetch')
 @click.option('--query', '-q', default='', help='Gmail search query')
-def list_emails(max_results, query):
+@click.option('--no-cache', is_flag=True, help='Do not use the local message cache')
+def list_emails(max_results, query, no_cache):
     """List recent emails from inbox."""
     try:
-        service = get_gmail_service()
-        client = GmailClient(service)
-
-        click.echo(f"Fetching {max_results} emails...")
-        messages = client.list_messages(max_results=max_results, query=query)
-
-        if not messages:
-            click.echo("No messages found.")
-            return
+        client = get_client(use_cache=not no_cache)
 
-        click.echo(f"\nFound {len(messages)} emails:\n")
+        click.echo(f"Fetching {max_results} emails...\n")
+        messages = client.iter_messages(
+            max_results=max_results,
+            query=query,
+            metadata_only=True
+        )
 
+        # Print each page of results as soon as it arrives
+        count = 0
         for idx, msg in enumerate(messages, 1):
             click.echo(f"{idx}. Subject: {msg.get('subject', '(No Subject)')}")
             click.echo(f"   From: {msg.get('from', '')}")
             click.echo(f"   Date: {msg.get('date', '')}")
             click.echo(f"   Snippet: {msg.get('snippet', '')[:80]}...")
             click.echo()
+            count = idx
+
+        if not count:
+            click.echo("No messages found.")
+            return
+
+        click.echo(f"Found {count} emails.")
 
     except FileNotFoundError as e:
         click.echo(f"Error: {e}", err=True)
@@ -48,7 +66,7 @@ def list_emails(max_results, query):
 
 
 @cli.command()
-@click.option('--max-results', '-n', default=50, help='Number of emails to fetch')
+@click.option('--max-results', '-n', default=50, help='Maximum number of matching emails')
 @click.option('--keywords', '-k', multiple=True, required=True,
               help='Keywords to filter (can specify multiple times)')
 @click.option('--subject-only', is_flag=True, help='Search subject only')
@@ -59,36 +77,55 @@ def list_emails(max_results, query):
 @click.option('--eml', is_flag=True, help='Export to EML files')
 @click.option('--query', '-q', default='', help='Gmail search query (pre-filter)')
 @click.option('--reverse', '-r', is_flag=True, help='Sort in reverse chronological order (newest first)')
+@click.option('--no-cache', is_flag=True, help='Do not use the local message cache')
 def filter_emails(max_results, keywords, subject_only, body_only,
-                 case_sensitive, output_dir, html, eml, query, reverse):
+                 case_sensitive, output_dir, html, eml, query, reverse, no_cache):
     """Filter emails by keywords and export them."""
     try:
-        service = get_gmail_service()
-        client = GmailClient(service)
-
-        click.echo(f"Fetching {max_results} emails...")
-        messages = client.list_messages(max_results=max_results, query=query)
-
-        if not messages:
-            click.echo("No messages found.")
-            return
+        client = get_client(use_cache=not no_cache)
 
         # Determine search locations
         search_subject = not body_only
         search_body = not subject_only
 
-        # Apply keyword filter
+        # Let Gmail match the keywords server-side
         keywords_list = list(keywords)
         click.echo(f"Filtering by keywords: {', '.join(keywords_list)}")
-
-        filtered = EmailFilter.filter_by_keywords(
-            messages,
+        keyword_query = EmailFilter.build_keyword_query(
             keywords_list,
             search_subject=search_subject,
             search_body=search_body,
-            case_sensitive=case_sensitive
+            query=query
+        )
+
+        # Gmail search is case-insensitive and cannot exclude the subject,
+        # so those cases are re-checked locally, which needs the bodies
+        # unless only the subject is searched
+        local_check = case_sensitive or body_only
+        metadata_only = not (local_check and search_body)
+
+        click.echo(f"Fetching {max_results} emails...")
+        messages = client.list_messages(
+            max_results=max_results,
+            query=keyword_query,
+            metadata_only=metadata_only
         )
 
+        if not messages:
+            click.echo("No messages matched the filter criteria.")
+            return
+
+        if local_check:
+            filtered = EmailFilter.filter_by_keywords(
+                messages,
+                keywords_list,
+                search_subject=search_subject,
+                search_body=search_body,
+                case_sensitive=case_sensitive
+            )
+        else:
+            filtered = messages
+
         if not filtered:
             click.echo("No messages matched the filter criteria.")
             return
@@ -109,6 +146,9 @@ def filter_emails(max_results, keywords, subject_only, body_only,
             click.echo(f"Exported {len(saved)} emails to EML files.")
 
         if html:
+            # Only the matching messages need their bodies downloaded
+            if metadata_only:
+                client.hydrate(filtered)
             click.echo(f"\nExporting to HTML file '{html}'...")
             EmailExporter.export_to_html(filtered, html, sort_chronological=True, reverse=reverse)
             click.echo("HTML export complete.")
@@ -124,21 +164,27 @@ def filter_emails(max_results, keywords, subject_only, body_only,
 @click.option('--max-results', '-n', default=50, help='Number of emails to fetch')
 @click.option('--output-dir', '-o', default='downloads', help='Output directory')
 @click.option('--query', '-q', default='', help='Gmail search query')
-def export_eml(max_results, output_dir, query):
+@click.option('--no-cache', is_flag=True, help='Do not use the local message cache')
+def export_eml(max_results, output_dir, query, no_cache):
     """Export emails to EML files."""
     try:
-        service = get_gmail_service()
-        client = GmailClient(service)
+        client = get_client(use_cache=not no_cache)
+
+        click.echo(f"Exporting up to {max_results} emails to '{output_dir}'...")
+        # Only IDs and subjects are needed; the EML content is fetched raw
+        messages = client.iter_messages(
+            max_results=max_results,
+            query=query,
+            metadata_only=True
+        )
 
-        click.echo(f"Fetching {max_results} emails...")
-        messages = client.list_messages(max_results=max_results, query=query)
+        # Downloads start while later result pages are still being listed
+        saved = EmailExporter.export_to_eml(messages, client, output_dir)
 
-        if not messages:
+        if not saved:
             click.echo("No messages found.")
             return
 
-        click.echo(f"Exporting {len(messages)} emails to '{output_dir}'...")
-        saved = EmailExporter.export_to_eml(messages, client, output_dir)
         click.echo(f"\nExported {len(saved)} emails successfully.")
 
     except FileNotFoundError as e:
@@ -153,11 +199,11 @@ def export_eml(max_results, output_dir, query):
 @click.option('--output', '-o', default='emails.html', help='Output HTML file')
 @click.option('--query', '-q', default='', help='Gmail search query')
 @click.option('--reverse', '-r', is_flag=True, help='Sort in reverse chronological order (newest first)')
-def export_html(max_results, output, query, reverse):
+@click.option('--no-cache', is_flag=True, help='Do not use the local message cache')
+def export_html(max_results, output, query, reverse, no_cache):
     """Export emails to HTML file."""
     try:
-        service = get_gmail_service()
-        client = GmailClient(service)
+        client = get_client(use_cache=not no_cache)
 
         click.echo(f"Fetching {max_results} emails...")
         messages = client.list_messages(max_results=max_results, query=query)
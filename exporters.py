@@ -1,107 +1,32 @@
 """
 Email export utilities for EML and HTML formats.
 """
+import logging
 import os
 import re
-from typing import List, Dict
-from datetime import datetime
+import string
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Dict, Optional, TextIO
+from datetime import datetime, timezone
 from email.utils import parsedate_to_datetime
 import html
+import unicodedata
 
+logger = logging.getLogger(__name__)
 
-class EmailExporter:
-    """Export emails to various formats."""
-
-    @staticmethod
-    def export_to_eml(
-        messages: List[Dict],
-        gmail_client,
-        output_dir: str = 'downloads'
-    ) -> List[str]:
-        """
-        Export messages to .eml files.
-
-        Args:
-            messages: List of message dictionaries
-            gmail_client: GmailClient instance for fetching raw messages
-            output_dir: Directory to save .eml files
-
-        Returns:
-            List of saved file paths
-        """
-        os.makedirs(output_dir, exist_ok=True)
-        saved_files = []
-
-        for msg in messages:
-            msg_id = msg['id']
-            raw_message = gmail_client.get_raw_message(msg_id)
-
-            if raw_message:
-                # Create safe filename from subject and ID
-                subject = msg.get('subject', 'no-subject')
-                safe_subject = EmailExporter._sanitize_filename(subject)
-                filename = f"{safe_subject}_{msg_id[:8]}.eml"
-                filepath = os.path.join(output_dir, filename)
-
-                with open(filepath, 'wb') as f:
-                    f.write(raw_message)
-
-                saved_files.append(filepath)
-                print(f"Saved: {filepath}")
-
-        return saved_files
-
-    @staticmethod
-    def export_to_html(
-        messages: List[Dict],
-        output_file: str = 'emails.html',
-        sort_chronological: bool = True,
-        reverse: bool = False
-    ) -> str:
-        """
-        Export messages to a single HTML file.
-
-        Args:
-            messages: List of message dictionaries
-            output_file: Output HTML file path
-            sort_chronological: Sort emails chronologically
-            reverse: Sort in reverse order (newest first)
-
-        Returns:
-            Path to saved HTML file
-        """
-        if sort_chronological:
-            def parse_date(msg):
-                try:
-                    date_str = msg.get('date', '')
-                    if date_str:
-                        return parsedate_to_datetime(date_str)
-                    return datetime.min
-                except Exception:
-                    return datetime.min
+# Write buffer for export files, large enough to batch many small writes
+WRITE_BUFFER_SIZE = 1 << 23
 
-            messages = sorted(messages, key=parse_date, reverse=reverse)
+# Sort key for messages without a usable date
+_MIN_DATE = datetime.min.replace(tzinfo=timezone.utc)
 
-        html_content = EmailExporter._generate_html(messages)
+# Translation table deleting every ASCII character not allowed in filenames
+_UNSAFE_FILENAME_CHARS = str.maketrans(
+    '', '', ''.join(c for c in map(chr, range(128)) if not (c.isalnum() or c in ' -_'))
+)
 
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-
-        print(f"Saved HTML: {output_file}")
-        return output_file
-
-    @staticmethod
-    def _generate_html(messages: List[Dict]) -> str:
-        """
-        Generate HTML content from messages.
-
-        Args:
-            messages: List of message dictionaries
-
-        Returns:
-            HTML string
-        """
-        html_parts = ["""<!DOCTYPE html>
+# Document header; $count and $generated are filled in per export
+_HTML_HEADER_TEMPLATE = string.Template("""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -168,10 +93,179 @@ class EmailExporter:
 <body>
     <h1>Gmail Export</h1>
     <div class="summary">
-        <p><strong>Total Emails:</strong> """ + str(len(messages)) + """</p>
-        <p><strong>Generated:</strong> """ + datetime.now().strftime('%Y-%m-%d %H:%M:%S') + """</p>
+        <p><strong>Total Emails:</strong> $count</p>
+        <p><strong>Generated:</strong> $generated</p>
+    </div>
+""")
+
+# Markup for a single email
+_EMAIL_TEMPLATE = string.Template("""
+    <div class="email-container" id="email-$idx">
+        <div class="email-header">
+            <div class="email-subject">$subject</div>
+            <div class="email-meta"><span class="label">From:</span>$from_email</div>
+            <div class="email-meta"><span class="label">To:</span>$to_email</div>
+            <div class="email-meta"><span class="label">Date:</span>$date</div>
+        </div>
+        <div class="email-body">
+            $body
+        </div>
     </div>
-"""]
+""")
+
+_HTML_FOOTER = """
+</body>
+</html>
+"""
+
+
+class EmailExporter:
+    """Export emails to various formats."""
+
+    @staticmethod
+    def export_to_eml(
+        messages: Iterable[Dict],
+        gmail_client,
+        output_dir: str = 'downloads',
+        max_workers: int = 10
+    ) -> List[str]:
+        """
+        Export messages to .eml files.
+
+        Each worker downloads a raw message and writes its file, so disk
+        writes overlap with the other downloads still in flight.
+
+        Args:
+            messages: Message dictionaries (any iterable)
+            gmail_client: GmailClient instance for fetching raw messages
+            output_dir: Directory to save .eml files
+            max_workers: Number of concurrent downloads
+
+        Returns:
+            List of saved file paths
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        saved_files = []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(EmailExporter._save_eml, msg, gmail_client, output_dir)
+                for msg in messages
+            ]
+
+            # Collect in message order, so the result does not depend on
+            # which download finishes first
+            for future in futures:
+                filepath = future.result()
+                if filepath:
+                    saved_files.append(filepath)
+                    print(f"Saved: {filepath}")
+
+        return saved_files
+
+    @staticmethod
+    def _save_eml(msg: Dict, gmail_client, output_dir: str) -> Optional[str]:
+        """
+        Download one raw message and write it to an .eml file.
+
+        Args:
+            msg: Message dictionary
+            gmail_client: GmailClient instance for fetching raw messages
+            output_dir: Directory to save the .eml file in
+
+        Returns:
+            Path of the saved file, or None if the download failed
+        """
+        msg_id = msg['id']
+        raw_message = gmail_client.get_raw_message(msg_id)
+        if not raw_message:
+            return None
+
+        # Create safe filename from subject and ID
+        subject = msg.get('subject', 'no-subject')
+        safe_subject = EmailExporter._sanitize_filename(subject)
+        filename = f"{safe_subject}_{msg_id[:8]}.eml"
+        filepath = os.path.join(output_dir, filename)
+
+        # One failed file must not abort the rest of the export
+        try:
+            with open(filepath, 'wb') as f:
+                f.write(raw_message)
+        except OSError as e:
+            logger.error("Error saving %s: %s", filepath, e)
+            return None
+
+        return filepath
+
+    @staticmethod
+    def export_to_html(
+        messages: List[Dict],
+        output_file: str = 'emails.html',
+        sort_chronological: bool = True,
+        reverse: bool = False
+    ) -> str:
+        """
+        Export messages to a single HTML file.
+
+        Args:
+            messages: List of message dictionaries
+            output_file: Output HTML file path
+            sort_chronological: Sort emails chronologically
+            reverse: Sort in reverse order (newest first)
+
+        Returns:
+            Path to saved HTML file
+        """
+        if sort_chronological:
+            # sorted() evaluates the key once per message
+            messages = sorted(messages, key=EmailExporter._parse_date, reverse=reverse)
+
+        with open(output_file, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+            EmailExporter._generate_html(messages, f)
+
+        print(f"Saved HTML: {output_file}")
+        return output_file
+
+    @staticmethod
+    def _parse_date(msg: Dict) -> datetime:
+        """
+        Parse a message's Date header into a sortable datetime.
+
+        Args:
+            msg: Message dictionary
+
+        Returns:
+            Timezone-aware datetime, or the earliest possible datetime
+            if the date is missing or unparseable
+        """
+        try:
+            date_str = msg.get('date', '')
+            if date_str:
+                parsed = parsedate_to_datetime(date_str)
+                # Dates with a -0000 offset parse as naive; treat as UTC
+                if parsed.tzinfo is None:
+                    parsed = parsed.replace(tzinfo=timezone.utc)
+                return parsed
+        except Exception:
+            pass
+        return _MIN_DATE
+
+    @staticmethod
+    def _generate_html(messages: List[Dict], out: TextIO):
+        """
+        Write HTML content for messages to a stream.
+
+        Each email is written as it is rendered, so memory use does not
+        grow with the size of the export.
+
+        Args:
+            messages: List of message dictionaries
+            out: Text stream to write the HTML document to
+        """
+        out.write(_HTML_HEADER_TEMPLATE.substitute(
+            count=len(messages),
+            generated=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        ))
 
         for idx, msg in enumerate(messages, 1):
             subject = html.escape(msg.get('subject', '(No Subject)'))
@@ -188,27 +282,16 @@ class EmailExporter:
                 # Replace cid: references with data URIs
                 body = EmailExporter._replace_cid_with_data_uri(body, msg.get('inline_images', {}))
 
-            email_html = f"""
-    <div class="email-container" id="email-{idx}">
-        <div class="email-header">
-            <div class="email-subject">{subject}</div>
-            <div class="email-meta"><span class="label">From:</span>{from_email}</div>
-            <div class="email-meta"><span class="label">To:</span>{to_email}</div>
-            <div class="email-meta"><span class="label">Date:</span>{date}</div>
-        </div>
-        <div class="email-body">
-            {body}
-        </div>
-    </div>
-"""
-            html_parts.append(email_html)
-
-        html_parts.append("""
-</body>
-</html>
-""")
+            out.write(_EMAIL_TEMPLATE.substitute(
+                idx=idx,
+                subject=subject,
+                from_email=from_email,
+                to_email=to_email,
+                date=date,
+                body=body
+            ))
 
-        return ''.join(html_parts)
+        out.write(_HTML_FOOTER)
 
     @staticmethod
     def _replace_cid_with_data_uri(html_body: str, inline_images: Dict[str, Dict]) -> str:
@@ -245,6 +328,29 @@ class EmailExporter:
 
         return html_body
 
+    @staticmethod
+    def _fold_latin_accents(text: str) -> str:
+        """
+        Strip accents from Latin letters, leaving other characters as-is.
+
+        Args:
+            text: Text to fold
+
+        Returns:
+            Text with combining marks removed from Latin base letters
+        """
+        folded = []
+        base = ''
+        for c in unicodedata.normalize('NFKD', text):
+            if unicodedata.combining(c):
+                # Marks on Latin letters (below U+0250) are dropped
+                if base >= '\u0250':
+                    folded.append(c)
+            else:
+                base = c
+                folded.append(c)
+        return unicodedata.normalize('NFC', ''.join(folded))
+
     @staticmethod
     def _sanitize_filename(filename: str, max_length: int = 50) -> str:
         """
@@ -257,13 +363,17 @@ class EmailExporter:
         Returns:
             Sanitized filename
         """
-        # Remove invalid characters
-        safe = ''.join(c for c in filename if c.isalnum() or c in (' ', '-', '_'))
-        # Replace spaces with underscores
-        safe = safe.replace(' ', '_')
-        # Truncate if too long
-        if len(safe) > max_length:
-            safe = safe[:max_length]
-        # Remove trailing underscores
-        safe = safe.rstrip('_')
+        if filename.isascii():
+            # Remove invalid characters
+            safe = filename.translate(_UNSAFE_FILENAME_CHARS)
+        else:
+            # Fold accents on Latin letters (Café -> Cafe), keeping letters
+            # of other scripts (CJK, Cyrillic, Greek, ...) whole, then
+            # remove invalid characters
+            safe = ''.join(
+                c for c in EmailExporter._fold_latin_accents(filename)
+                if c.isalnum() or c in ' -_'
+            )
+        # Replace spaces with underscores, truncate, and remove trailing underscores
+        safe = safe.replace(' ', '_')[:max_length].rstrip('_')
         return safe or 'email'
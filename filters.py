@@ -1,8 +1,33 @@
 """
 Email filtering utilities.
 """
+import functools
 import re
-from typing import List, Dict
+from typing import Callable, List, Dict
+
+try:
+    import ahocorasick
+except ImportError:
+    # Optional speedup for multi-keyword matching (pip install pyahocorasick)
+    ahocorasick = None
+
+
+@functools.lru_cache(maxsize=32)
+def _build_automaton(keywords: tuple):
+    """
+    Build an Aho-Corasick automaton matching any of the keywords.
+
+    Args:
+        keywords: Tuple of non-empty keywords
+
+    Returns:
+        ahocorasick.Automaton ready for searching
+    """
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
 
 
 class EmailFilter:
@@ -32,20 +57,87 @@ class EmailFilter:
         if not keywords:
             return messages
 
+        matcher = EmailFilter._keyword_matcher(keywords, case_sensitive)
         filtered = []
 
         for msg in messages:
             if EmailFilter._message_matches_keywords(
-                msg, keywords, search_subject, search_body, case_sensitive
+                msg, matcher, search_subject, search_body, case_sensitive
             ):
                 filtered.append(msg)
 
         return filtered
 
+    @staticmethod
+    def _keyword_matcher(
+        keywords: List[str],
+        case_sensitive: bool
+    ) -> Callable[[str], bool]:
+        """
+        Build a predicate testing whether text contains any keyword.
+
+        Uses a single-pass Aho-Corasick automaton when pyahocorasick is
+        installed, otherwise one substring scan per keyword.
+
+        Args:
+            keywords: Keywords to search for
+            case_sensitive: Case-sensitive search; if False, the predicate
+                expects lower-cased text
+
+        Returns:
+            Function taking text and returning True if any keyword matches
+        """
+        if not case_sensitive:
+            keywords = [k.lower() for k in keywords]
+
+        # An empty keyword matches everything and cannot go in an automaton
+        if ahocorasick is not None and all(keywords):
+            automaton = _build_automaton(tuple(keywords))
+            return lambda text: next(automaton.iter(text), None) is not None
+
+        return lambda text: any(keyword in text for keyword in keywords)
+
+    @staticmethod
+    def build_keyword_query(
+        keywords: List[str],
+        search_subject: bool = True,
+        search_body: bool = True,
+        query: str = ''
+    ) -> str:
+        """
+        Build a Gmail search query matching any of the keywords.
+
+        Lets Gmail do the keyword match server-side so non-matching
+        messages are never downloaded. Gmail search ignores case and has
+        no body-only operator, so callers needing either should still run
+        filter_by_keywords on the results.
+
+        Args:
+            keywords: List of keywords to search for
+            search_subject: Search in subject line
+            search_body: Search in body text
+            query: Existing Gmail query to combine with (optional)
+
+        Returns:
+            Gmail search query string
+        """
+        if not keywords:
+            return query
+
+        # Gmail has no quote escaping inside phrases
+        phrases = ['"' + k.replace('"', '') + '"' for k in keywords]
+        if search_subject and not search_body:
+            phrases = ['subject:' + p for p in phrases]
+
+        keyword_query = '(' + ' OR '.join(phrases) + ')'
+        if query:
+            return f"({query}) {keyword_query}"
+        return keyword_query
+
     @staticmethod
     def _message_matches_keywords(
         message: Dict,
-        keywords: List[str],
+        matcher: Callable[[str], bool],
         search_subject: bool,
         search_body: bool,
         case_sensitive: bool
@@ -55,7 +147,7 @@ class EmailFilter:
 
         Args:
             message: Message dictionary
-            keywords: Keywords to search for
+            matcher: Keyword predicate from _keyword_matcher
             search_subject: Search in subject
             search_body: Search in body
             case_sensitive: Case-sensitive search
@@ -63,23 +155,21 @@ class EmailFilter:
         Returns:
             True if any keyword matches
         """
-        search_text = ''
-
+        fields = []
         if search_subject:
-            search_text += message.get('subject', '') + ' '
-
+            fields.append('subject')
         if search_body:
-            search_text += message.get('body_text', '') + ' '
-            search_text += message.get('body_html', '') + ' '
-            search_text += message.get('snippet', '')
-
-        if not case_sensitive:
-            search_text = search_text.lower()
-            keywords = [k.lower() for k in keywords]
-
-        # Check if any keyword matches
-        for keyword in keywords:
-            if keyword in search_text:
+            fields.extend(('body_text', 'body_html', 'snippet'))
+
+        # Scan fields one at a time so a hit in the subject skips
+        # lower-casing large HTML bodies
+        for field in fields:
+            text = message.get(field, '')
+            if not case_sensitive:
+                # str.lower() already has a fast path for ASCII-only text;
+                # encoding to bytes first would only add a copy
+                text = text.lower()
+            if matcher(text):
                 return True
 
         return False
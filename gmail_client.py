@@ -1,232 +1,1036 @@
 """
 Gmail API client wrapper for fetching and processing emails.
 """
-import base64
-from email.mime.text import MIMEText
-from typing import List, Dict, Optional
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Iterator, List, Dict, Optional, Tuple
 
+import httplib2
+from googleapiclient.errors import HttpError
 
-class GmailClient:
+try:
+    # Optional SIMD-accelerated base64 (pip install pybase64)
+    from pybase64 import urlsafe_b64decode
+except ImportError:
+    from base64 import urlsafe_b64decode
+
+from auth import build_http, get_service
+from cache import MessageCache
+
+logger = logging.getLogger(__name__)
+
+# Gmail accepts at most 100 calls per batch request
+BATCH_SIZE = 100
+
+# Batch requests in flight at once; more tend to trigger 429 responses
+MAX_BATCH_WORKERS = 5
+
+# Largest page of message IDs Gmail returns from messages().list()
+LIST_PAGE_SIZE = 500
+
+# Rate-limit / server error responses worth retrying with backoff
+RETRY_STATUSES = (429, 500, 503)
+MAX_RETRIES = 5
+
+# Transport failures retried along with RETRY_STATUSES: OSError covers
+# timeouts, dropped connections and ssl.SSLError; DNS failures surface as
+# httplib2.ServerNotFoundError
+TRANSIENT_ERRORS = (OSError, httplib2.ServerNotFoundError)
+
+# Errors a request can still fail with once its retries are used up
+REQUEST_ERRORS = (HttpError,) + TRANSIENT_ERRORS
+
+# Longest wait in seconds between retries
+MAX_BACKOFF = 32
+
+# Headers and response fields requested for metadata-only fetches
+METADATA_HEADERS = ['Subject', 'From', 'To', 'Date', 'Message-ID']
+METADATA_FIELDS = 'id,threadId,historyId,snippet,payload/headers'
+
+# Partial-response masks for the other requests, trimming labelIds,
+# sizeEstimate, historyId etc. from the responses. Selecting parts keeps
+# every field of nested parts, which the MIME walks need. historyId is
+# kept so cached responses can be checked against get_message(history_id).
+FULL_FIELDS = 'id,threadId,historyId,snippet,payload(mimeType,headers,body,parts)'
+RAW_FIELDS = 'id,raw'
+LIST_FIELDS = 'messages/id,nextPageToken'
+
+# Masks the cache stores responses under the plain format name for
+DEFAULT_FIELDS = {
+    'metadata': METADATA_FIELDS,
+    'full': FULL_FIELDS,
+    'raw': RAW_FIELDS
+}
+
+# Parsed messages kept in memory by each GmailClient for get_message
+PARSED_CACHE_SIZE = 1000
+
+# Lower-cased names of the headers _parse_message extracts
+PARSED_HEADERS = frozenset(h.lower() for h in METADATA_HEADERS)
+
+# Dictionary keys of a ParsedMessage, and the attributes they differ from
+MESSAGE_KEYS = (
+    'id', 'threadId', 'subject', 'from', 'to', 'date', 'message_id',
+    'snippet', 'body_html', 'body_text', 'inline_images', 'raw'
+)
+_KEY_ATTRS = {'from': 'from_'}
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Compute an exponential backoff delay with jitter.
+
+    Args:
+        attempt: Zero-based retry attempt
+
+    Returns:
+        Delay in seconds
+    """
+    return min(2 ** attempt + random.random(), MAX_BACKOFF)
+
+
+def _execute_with_retry(request, http=None):
+    """
+    Execute an API request, retrying with exponential backoff.
+
+    Args:
+        request: googleapiclient HttpRequest to execute
+        http: Optional HTTP transport to execute the request with
+
+    Returns:
+        API response
+    """
+    for attempt in range(MAX_RETRIES):
+        try:
+            return request.execute(http=http)
+        except HttpError as e:
+            if e.resp.status not in RETRY_STATUSES or attempt == MAX_RETRIES - 1:
+                raise
+            reason = f"HTTP {e.resp.status}"
+        except TRANSIENT_ERRORS as e:
+            if attempt == MAX_RETRIES - 1:
+                raise
+            reason = repr(e)
+        delay = backoff_delay(attempt)
+        logger.warning("Request failed with %s, retrying in %.1fs", reason, delay)
+        time.sleep(delay)
+
+
+def _decode_body(data: str) -> str:
+    """
+    Decode a base64url-encoded message body.
+
+    Args:
+        data: Body data from the API
+
+    Returns:
+        Decoded body content
+    """
+    return urlsafe_b64decode(data).decode('utf-8', errors='ignore')
+
+
+def cache_format(params: Dict) -> str:
+    """
+    Name the cache format for messages().get() parameters.
+
+    Responses fetched with a custom fields mask hold different data than
+    the default for their format, so they are cached separately.
+
+    Args:
+        params: Parameters for messages().get() (must include format)
+
+    Returns:
+        Format name to store the response under in MessageCache
+    """
+    fmt = params['format']
+    fields = params.get('fields')
+    if fields is None or fields == DEFAULT_FIELDS.get(fmt):
+        return fmt
+    return f"{fmt}[{fields}]"
+
+
+@dataclass(slots=True, eq=False)
+class ParsedMessage(MutableMapping):
+    """
+    Parsed message, with bodies decoded on first access.
+
+    A slotted object holds the same fields in about half the memory of
+    a dict, which adds up over thousands of messages. List views and
+    subject filters never read body_html / body_text, so those only pay
+    for the base64 and UTF-8 decoding when a body is actually used.
+
+    Messages are also mutable mappings over MESSAGE_KEYS (msg['subject'],
+    msg.get('from'), items(), len(), dict(msg), ...), so callers can treat
+    them as dictionaries. They are not dict instances, and the key set is
+    fixed: unknown keys raise KeyError and keys cannot be deleted.
+    """
+
+    id: str
+    threadId: str
+    subject: str = ''
+    from_: str = ''
+    to: str = ''
+    date: str = ''
+    message_id: str = ''
+    snippet: str = ''
+    inline_images: Dict[str, Dict] = field(default_factory=dict)
+    raw: Dict = field(default_factory=dict, repr=False)
+    # Still base64-encoded bodies, and the decoded ones once read
+    html_data: str = field(default='', repr=False)
+    text_data: str = field(default='', repr=False)
+    _body_html: Optional[str] = field(default=None, init=False, repr=False)
+    _body_text: Optional[str] = field(default=None, init=False, repr=False)
+
+    @property
+    def body_html(self) -> str:
+        """HTML body, decoded from html_data on first access."""
+        if self._body_html is None:
+            self._body_html = _decode_body(self.html_data) if self.html_data else ''
+            self.html_data = ''
+        return self._body_html
+
+    @body_html.setter
+    def body_html(self, value: str):
+        self._body_html = value
+        self.html_data = ''
+
+    @property
+    def body_text(self) -> str:
+        """Plain text body, decoded from text_data on first access."""
+        if self._body_text is None:
+            self._body_text = _decode_body(self.text_data) if self.text_data else ''
+            self.text_data = ''
+        return self._body_text
+
+    @body_text.setter
+    def body_text(self, value: str):
+        self._body_text = value
+        self.text_data = ''
+
+    def __getitem__(self, key: str):
+        """Read a field by its dictionary key."""
+        if key not in MESSAGE_KEYS:
+            raise KeyError(key)
+        return getattr(self, _KEY_ATTRS.get(key, key))
+
+    def __setitem__(self, key: str, value):
+        """Set a field by its dictionary key."""
+        if key not in MESSAGE_KEYS:
+            raise KeyError(key)
+        setattr(self, _KEY_ATTRS.get(key, key), value)
+
+    def __delitem__(self, key: str):
+        """Refuse to delete a field; every message has all MESSAGE_KEYS."""
+        raise TypeError(f"cannot delete ParsedMessage key {key!r}")
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the dictionary keys."""
+        return iter(MESSAGE_KEYS)
+
+    def __len__(self) -> int:
+        """Number of dictionary keys."""
+        return len(MESSAGE_KEYS)
+
+    def __contains__(self, key) -> bool:
+        """Check for a key without reading (and decoding) its value."""
+        return key in MESSAGE_KEYS
+
+    def copy(self) -> Dict:
+        """
+        Copy the message into a plain dict, decoding both bodies.
+
+        Returns:
+            Dictionary of every message key
+        """
+        return dict(self)
+
+    def update(self, other=(), **kwargs):
+        """
+        Copy fields from another message or a mapping.
+
+        Args:
+            other: ParsedMessage (bodies are copied still encoded), or a
+                mapping or iterable of (key, value) pairs
+            **kwargs: More fields to set by key
+        """
+        if isinstance(other, ParsedMessage):
+            for name in ParsedMessage.__slots__:
+                setattr(self, name, getattr(other, name))
+            other = ()
+        MutableMapping.update(self, other, **kwargs)
+
+
+class MessageParser:
+    """
+    Message parsing shared by GmailClient and AsyncGmailClient.
+
+    Classes using it set self.cache to a MessageCache or None.
+    """
+
+    cache: Optional[MessageCache] = None
+
+    # Raw RFC822 downloads are a full copy of the mailbox, so they are
+    # only cached when asked for
+    cache_raw: bool = False
+
+    def _uses_cache(self, params: Dict) -> bool:
+        """
+        Check whether responses fetched with these parameters are cached.
+
+        Args:
+            params: Parameters for messages().get() (must include format)
+
+        Returns:
+            True if the response should be read from and stored in the cache
+        """
+        return self.cache is not None and (params['format'] != 'raw' or self.cache_raw)
+
+    @staticmethod
+    def _get_params(metadata_only: bool, fields: Optional[str] = None) -> Dict:
+        """
+        Build messages().get() parameters for the requested detail level.
+
+        Args:
+            metadata_only: Request headers and snippet only
+            fields: Partial-response mask overriding the default
+
+        Returns:
+            Keyword arguments for messages().get()
+        """
+        if metadata_only:
+            return {
+                'format': 'metadata',
+                'metadataHeaders': METADATA_HEADERS,
+                'fields': fields or METADATA_FIELDS
+            }
+        return {'format': 'full', 'fields': fields or FULL_FIELDS}
+
+    def _cached_response(
+        self,
+        msg_id: str,
+        params: Dict,
+        history_id: Optional[str] = None
+    ) -> Optional[Dict]:
+        """
+        Look up a messages().get() response in the cache.
+
+        Args:
+            msg_id: Message ID
+            params: Parameters for messages().get() (must include format)
+            history_id: Expected history ID; a cached response with a
+                different one counts as missing
+
+        Returns:
+            Cached API response, or None if it must be fetched
+        """
+        if not self._uses_cache(params):
+            return None
+        cached = self.cache.get(msg_id, cache_format(params))
+        if cached is not None and history_id in (None, cached.get('historyId')):
+            return cached
+        return None
+
+    def _store_response(self, msg_id: str, params: Dict, response: Dict):
+        """
+        Store a messages().get() response in the cache, if there is one.
+
+        Args:
+            msg_id: Message ID
+            params: Parameters the response was fetched with
+            response: API response to cache
+        """
+        if self._uses_cache(params):
+            self.cache.set(msg_id, cache_format(params), response)
+
+    @staticmethod
+    def _attachment_key(msg_id: str, content_id: str) -> str:
+        """
+        Build the cache key of an inline image attachment.
+
+        Args:
+            msg_id: Message ID
+            content_id: Content-ID of the image
+
+        Returns:
+            Key to store the attachment response under in MessageCache
+        """
+        # Attachment IDs differ between fetches, so cache by Content-ID
+        return f"{msg_id}/{content_id}"
+
+    @staticmethod
+    def _pending_inline_images(inline_images: Dict[str, Dict]) -> List[str]:
+        """
+        List inline images whose data still has to be fetched.
+
+        Args:
+            inline_images: Inline images from _get_inline_images
+
+        Returns:
+            Content-IDs of images stored as separate attachments
+        """
+        return [
+            cid for cid, img_info in inline_images.items()
+            if img_info.get('attachment_id') and not img_info.get('data')
+        ]
+
+    def _parse_message(self, message: Dict, metadata_only: bool = False) -> ParsedMessage:
+        """
+        Parse message into a more usable format.
+
+        Args:
+            message: Raw message from API
+            metadata_only: Message was fetched without bodies
+
+        Returns:
+            ParsedMessage with the extracted fields
+        """
+        # Collect the wanted headers in one pass, keeping the first
+        # occurrence of any repeated header
+        headers = {}
+        for header in message['payload']['headers']:
+            name = header['name'].lower()
+            if name in PARSED_HEADERS and name not in headers:
+                headers[name] = header['value']
+
+        # Extract common headers
+        subject = headers.get('subject', '')
+        from_email = headers.get('from', '')
+        to_email = headers.get('to', '')
+        date = headers.get('date', '')
+        message_id = headers.get('message-id', '')
+
+        if metadata_only:
+            # Metadata responses carry no MIME parts to walk
+            html_data = text_data = ''
+            inline_images = {}
+        else:
+            # Locate bodies; they are decoded on first access
+            bodies = self._find_bodies(message['payload'])
+            html_data = bodies['text/html']
+            text_data = bodies['text/plain']
+
+            # Extract inline images; attachment data is fetched by the client
+            inline_images = self._get_inline_images(message['payload'])
+
+        return ParsedMessage(
+            id=message['id'],
+            threadId=message['threadId'],
+            subject=subject,
+            from_=from_email,
+            to=to_email,
+            date=date,
+            message_id=message_id,
+            snippet=message.get('snippet', ''),
+            inline_images=inline_images,
+            raw=message,
+            html_data=html_data,
+            text_data=text_data
+        )
+
+    def _find_bodies(self, payload: Dict) -> Dict[str, str]:
+        """
+        Find the HTML and plain text bodies in one walk of the MIME tree.
+
+        Args:
+            payload: Message payload
+
+        Returns:
+            Dictionary mapping 'text/html' and 'text/plain' to the still
+            base64-encoded data of the first part of that type ('' if none)
+        """
+        bodies = {'text/html': '', 'text/plain': ''}
+        remaining = len(bodies)
+
+        stack = [payload]
+        while stack and remaining:
+            part = stack.pop()
+            mime_type = part.get('mimeType')
+            if mime_type in bodies and not bodies[mime_type]:
+                data = part.get('body', {}).get('data')
+                if data:
+                    bodies[mime_type] = data
+                    remaining -= 1
+            # Push nested parts in reverse so they are visited in order
+            stack.extend(reversed(part.get('parts', ())))
+
+        return bodies
+
+    def _get_inline_images(self, payload: Dict) -> Dict[str, Dict]:
+        """
+        Extract inline images (attachments with Content-ID).
+
+        Args:
+            payload: Message payload
+
+        Returns:
+            Dictionary mapping Content-ID to image data and MIME type
+        """
+        inline_images = {}
+
+        stack = [payload]
+        while stack:
+            part = stack.pop()
+            stack.extend(reversed(part.get('parts', ())))
+
+            # Only images with a Content-ID header are inline
+            if not part.get('mimeType', '').startswith('image/'):
+                continue
+            headers = {
+                header['name'].lower(): header['value']
+                for header in part.get('headers', ())
+            }
+            # Content-ID is usually in format <id>, strip the brackets
+            content_id = headers.get('content-id', '').strip('<>')
+            if not content_id:
+                continue
+
+            body = part.get('body', {})
+            if 'attachmentId' in body:
+                # Image data needs to be fetched separately
+                inline_images[content_id] = {
+                    'attachment_id': body['attachmentId'],
+                    'mime_type': part['mimeType'],
+                    'data': None  # Will be fetched on demand
+                }
+            elif 'data' in body:
+                # Image data is directly available
+                inline_images[content_id] = {
+                    'data': body['data'],  # Already base64 encoded
+                    'mime_type': part['mimeType']
+                }
+
+        return inline_images
+
+
+class GmailClient(MessageParser):
     """Wrapper for Gmail API operations."""
 
-    def __init__(self, service):
+    def __init__(
+        self,
+        service,
+        cache: Optional[MessageCache] = None,
+        cache_raw: bool = False
+    ):
         """
         Initialize Gmail client.
 
         Args:
             service: Authenticated Gmail API service
+            cache: Optional MessageCache for reusing fetched messages
+            cache_raw: Also cache raw RFC822 downloads (get_raw_message,
+                export_raw_batch); off by default, as they duplicate
+                every exported message in the cache file
         """
         self.service = service
+        self.cache = cache
+        self.cache_raw = cache_raw
+        self._local = threading.local()
+
+        # Worker pool for concurrent batch and list requests, created on
+        # first use so its threads (and their transports) last between calls
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+        # LRU of (msg_id, format) -> parsed message
+        self._parsed = OrderedDict()
+        self._parsed_lock = threading.Lock()
+
+    @classmethod
+    def from_credentials(
+        cls,
+        creds,
+        cache: Optional[MessageCache] = None,
+        cache_raw: bool = False
+    ) -> 'GmailClient':
+        """
+        Create a client for credentials, reusing an existing service.
+
+        Services are memoized per credentials object by get_service, so
+        every client for the same account shares one keep-alive
+        connection.
+
+        Args:
+            creds: Google OAuth2 credentials
+            cache: Optional MessageCache for reusing fetched messages
+            cache_raw: Also cache raw RFC822 downloads
+
+        Returns:
+            GmailClient instance
+        """
+        return cls(get_service(creds), cache=cache, cache_raw=cache_raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shut down the worker threads used for concurrent requests."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """
+        Get the client's worker pool, creating it on first use.
+
+        Returns:
+            ThreadPoolExecutor with MAX_BATCH_WORKERS threads
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=MAX_BATCH_WORKERS,
+                    thread_name_prefix='gmail-client',
+                    initializer=self._mark_worker
+                )
+            return self._executor
+
+    def _mark_worker(self):
+        # Runs once in each worker thread of the pool
+        self._local.worker = True
+
+    def _in_worker(self) -> bool:
+        return getattr(self._local, 'worker', False)
+
+    def _request_http(self):
+        """
+        Choose the HTTP transport for requests made by the calling thread.
+
+        Pool workers use their own thread's transport; any other caller
+        uses the service's shared keep-alive transport.
+
+        Returns:
+            AuthorizedHttp for a worker thread, otherwise None (meaning
+            the service's transport)
+        """
+        return self._thread_http() if self._in_worker() else None
+
+    def _thread_http(self):
+        """
+        Get an authorized HTTP transport owned by the calling thread.
+
+        httplib2 is not thread-safe, so requests executed from worker
+        threads must not share the service's transport.
 
-    def list_messages(self, max_results: int = 10, query: str = '') -> List[Dict]:
+        Returns:
+            google_auth_httplib2.AuthorizedHttp for the current thread
+        """
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = build_http(self.service._http.credentials)
+            self._local.http = http
+        return http
+
+    def list_messages(
+        self,
+        max_results: int = 10,
+        query: str = '',
+        metadata_only: bool = False
+    ) -> List[ParsedMessage]:
         """
         List messages from inbox.
 
         Args:
             max_results: Maximum number of messages to retrieve
             query: Gmail search query (optional)
+            metadata_only: Fetch headers and snippet only, without bodies
 
         Returns:
-            List of message dictionaries with full details
+            List of parsed messages with full details
         """
         try:
-            # Get message IDs
-            results = self.service.users().messages().list(
+            return list(self.iter_messages(max_results, query, metadata_only))
+
+        except REQUEST_ERRORS as e:
+            logger.error("Error listing messages: %s", e)
+            return []
+
+    def iter_messages(
+        self,
+        max_results: int = 10,
+        query: str = '',
+        metadata_only: bool = False
+    ) -> Iterator[ParsedMessage]:
+        """
+        Iterate over messages from inbox as they are fetched.
+
+        Result pages of up to LIST_PAGE_SIZE IDs are followed with
+        nextPageToken until max_results IDs are listed; each later page is
+        listed on a worker thread while the current page's messages are
+        being fetched.
+        Messages are yielded after each batch request of up to BATCH_SIZE,
+        so callers can start processing right away. Up to
+        MAX_BATCH_WORKERS batches of a result page are fetched at once.
+
+        Args:
+            max_results: Maximum number of messages to retrieve
+            query: Gmail search query (optional)
+            metadata_only: Fetch headers and snippet only, without bodies
+
+        Yields:
+            Parsed messages with full details
+        """
+        params = self._get_params(metadata_only)
+        messages_api = self.service.users().messages()
+
+        def list_page(page_token: Optional[str], page_size: int) -> Dict:
+            request = messages_api.list(
                 userId='me',
-                maxResults=max_results,
-                q=query
-            ).execute()
+                maxResults=page_size,
+                q=query,
+                pageToken=page_token,
+                fields=LIST_FIELDS
+            )
+            return _execute_with_retry(request, http=self._request_http())
 
-            messages = results.get('messages', [])
+        remaining = max_results
+        results = list_page(None, min(remaining, LIST_PAGE_SIZE))
 
-            # Fetch full message details for each
-            full_messages = []
-            for msg in messages:
-                full_msg = self.get_message(msg['id'])
-                if full_msg:
-                    full_messages.append(full_msg)
+        while results is not None:
+            messages = results.get('messages', [])[:remaining]
+            remaining -= len(messages)
 
-            return full_messages
+            # List the next page while this page's messages are fetched,
+            # asking for no more IDs than are still wanted
+            page_token = results.get('nextPageToken')
+            next_page = None
+            if page_token and remaining > 0:
+                next_page = self._get_executor().submit(
+                    list_page, page_token, min(remaining, LIST_PAGE_SIZE)
+                )
 
-        except Exception as e:
-            print(f"Error listing messages: {e}")
-            return []
+            # Yield each batch's messages as soon as that batch is in
+            for chunk, responses in self._batch_get_chunks(
+                    [msg['id'] for msg in messages], **params):
+                for msg_id in chunk:
+                    response = responses.get(msg_id)
+                    if response:
+                        yield self._build_message(response, metadata_only)
 
-    def get_message(self, msg_id: str) -> Optional[Dict]:
+            results = None
+            if next_page is not None:
+                try:
+                    results = next_page.result()
+                except REQUEST_ERRORS as e:
+                    # Keep the messages already yielded
+                    logger.error("Error listing messages: %s", e)
+
+    def hydrate(self, messages: List[ParsedMessage]) -> List[ParsedMessage]:
         """
-        Get full message details.
+        Fill in bodies for messages fetched with metadata_only.
+
+        Full messages are fetched in batched requests and their details
+        are merged into the existing messages in place.
 
         Args:
-            msg_id: Message ID
+            messages: Parsed messages to complete
 
         Returns:
-            Message dictionary with parsed details
+            The same list of messages
         """
-        try:
-            message = self.service.users().messages().get(
+        responses = self._batch_get(
+            [msg['id'] for msg in messages],
+            **self._get_params(metadata_only=False)
+        )
+        for msg in messages:
+            response = responses.get(msg['id'])
+            if response:
+                msg.update(self._build_message(response))
+        return messages
+
+    def _batch_get(self, msg_ids: List[str], **params) -> Dict[str, Dict]:
+        """
+        Fetch several messages using Gmail batch requests.
+
+        Messages already in the cache are not requested again.
+
+        Args:
+            msg_ids: Message IDs to fetch
+            **params: Extra parameters for messages().get() (e.g. format)
+
+        Returns:
+            Dictionary mapping message ID to raw API response
+        """
+        fmt = cache_format(params)
+        use_cache = self._uses_cache(params)
+        responses = {}
+        if use_cache:
+            responses = self.cache.get_many(msg_ids, fmt)
+
+        fetched = self._execute_batch({
+            msg_id: self.service.users().messages().get(
                 userId='me',
                 id=msg_id,
-                format='full'
-            ).execute()
+                **params
+            )
+            for msg_id in msg_ids
+            if msg_id not in responses
+        })
 
-            return self._parse_message(message)
+        if use_cache and fetched:
+            self.cache.set_many(fmt, fetched.items())
 
-        except Exception as e:
-            print(f"Error getting message {msg_id}: {e}")
-            return None
+        responses.update(fetched)
+        return responses
 
-    def _parse_message(self, message: Dict) -> Dict:
+    def _batch_get_chunks(
+        self,
+        msg_ids: List[str],
+        **params
+    ) -> Iterator[Tuple[List[str], Dict[str, Dict]]]:
         """
-        Parse message into a more usable format.
+        Fetch messages BATCH_SIZE at a time, several batches concurrently.
 
         Args:
-            message: Raw message from API
+            msg_ids: Message IDs to fetch
+            **params: Extra parameters for messages().get() (e.g. format)
+
+        Yields:
+            (chunk of message IDs, _batch_get responses for the chunk), in
+            the order of msg_ids
+        """
+        chunks = [
+            msg_ids[start:start + BATCH_SIZE]
+            for start in range(0, len(msg_ids), BATCH_SIZE)
+        ]
+        if len(chunks) <= 1 or self._in_worker():
+            for chunk in chunks:
+                yield chunk, self._batch_get(chunk, **params)
+            return
+
+        results = self._get_executor().map(lambda chunk: self._batch_get(chunk, **params), chunks)
+        yield from zip(chunks, results)
+
+    def _execute_batch(self, requests: Dict[str, object]) -> Dict[str, Dict]:
+        """
+        Execute API requests in batches of up to BATCH_SIZE.
+
+        Items rejected with a retryable status (e.g. 429 rate limiting)
+        are sent again in a later batch with exponential backoff. Other
+        failures are reported and left out of the result.
+
+        Args:
+            requests: Dictionary mapping request ID to googleapiclient request
 
         Returns:
-            Parsed message dictionary
+            Dictionary mapping request ID to API response
         """
-        headers = message['payload']['headers']
+        responses = {}
+        pending = requests
 
-        # Extract common headers
-        subject = self._get_header(headers, 'Subject')
-        from_email = self._get_header(headers, 'From')
-        to_email = self._get_header(headers, 'To')
-        date = self._get_header(headers, 'Date')
-        message_id = self._get_header(headers, 'Message-ID')
-
-        # Extract body
-        body_html = self._get_body(message['payload'], 'text/html')
-        body_text = self._get_body(message['payload'], 'text/plain')
-
-        # Extract inline images
-        inline_images = self._get_inline_images(message['payload'])
-
-        # Fetch attachment data for inline images
-        msg_id = message['id']
-        for cid, img_info in inline_images.items():
-            if img_info.get('attachment_id') and not img_info.get('data'):
-                attachment_data = self.get_attachment(msg_id, img_info['attachment_id'])
-                if attachment_data:
-                    img_info['data'] = attachment_data
-
-        return {
-            'id': message['id'],
-            'threadId': message['threadId'],
-            'subject': subject,
-            'from': from_email,
-            'to': to_email,
-            'date': date,
-            'message_id': message_id,
-            'snippet': message.get('snippet', ''),
-            'body_html': body_html,
-            'body_text': body_text,
-            'inline_images': inline_images,
-            'raw': message
-        }
-
-    def _get_header(self, headers: List[Dict], name: str) -> str:
-        """
-        Extract header value by name.
+        for attempt in range(MAX_RETRIES):
+            retry = {}
+
+            def collect(request_id, response, exception):
+                if exception is None:
+                    responses[request_id] = response
+                elif (isinstance(exception, HttpError)
+                        and exception.resp.status in RETRY_STATUSES
+                        and attempt < MAX_RETRIES - 1):
+                    retry[request_id] = pending[request_id]
+                else:
+                    logger.error("Error in batch request %s: %s", request_id, exception)
+
+            items = list(pending.items())
+            batches = []
+            for start in range(0, len(items), BATCH_SIZE):
+                batch = self.service.new_batch_http_request(callback=collect)
+                for request_id, request in items[start:start + BATCH_SIZE]:
+                    batch.add(request, request_id=request_id)
+                batches.append(batch)
+            self._execute_batches(batches)
+
+            if not retry:
+                break
+            pending = retry
+            delay = backoff_delay(attempt)
+            logger.warning("%d batch items rate limited, retrying in %.1fs", len(retry), delay)
+            time.sleep(delay)
+
+        return responses
+
+    def _execute_batches(self, batches: List[object]):
+        """
+        Execute batch requests, up to MAX_BATCH_WORKERS at once.
+
+        Each batch is retried with backoff on its own, so a rate-limited
+        batch does not hold up the others. A batch that still fails is
+        reported and its items are left without responses, so the other
+        batches' results are kept. A single batch, or batches sent from a
+        worker thread (which must not wait on the pool it runs in), are
+        executed in the calling thread.
+
+        Args:
+            batches: googleapiclient BatchHttpRequest objects
+        """
+        def execute(batch):
+            try:
+                _execute_with_retry(batch, http=self._request_http())
+            except REQUEST_ERRORS as e:
+                logger.error("Error in batch request: %s", e)
+
+        if len(batches) <= 1 or self._in_worker():
+            for batch in batches:
+                execute(batch)
+            return
+
+        futures = [self._get_executor().submit(execute, batch) for batch in batches]
+        for future in as_completed(futures):
+            future.result()
+
+    def get_message(
+        self,
+        msg_id: str,
+        metadata_only: bool = False,
+        fields: Optional[str] = None,
+        history_id: Optional[str] = None
+    ) -> Optional[ParsedMessage]:
+        """
+        Get full message details.
+
+        Messages recently returned by this method are kept in memory, so
+        fetching the same message again skips the request and the parse.
 
         Args:
-            headers: List of header dictionaries
-            name: Header name to find
+            msg_id: Message ID
+            metadata_only: Fetch headers and snippet only, without bodies
+            fields: Partial-response mask overriding the default; it must
+                keep the fields _parse_message reads (id, threadId and
+                payload headers, plus payload parts for bodies)
+            history_id: Current history ID of the message, if known (e.g.
+                from a history sync); kept and cached copies with a
+                different history ID are fetched again and replaced
 
         Returns:
-            Header value or empty string
+            Parsed message details
         """
-        for header in headers:
-            if header['name'].lower() == name.lower():
-                return header['value']
-        return ''
+        try:
+            params = self._get_params(metadata_only, fields)
+            key = (msg_id, cache_format(params))
+
+            with self._parsed_lock:
+                parsed = self._parsed.get(key)
+                if parsed is not None and history_id in (None, parsed.raw.get('historyId')):
+                    self._parsed.move_to_end(key)
+                    return parsed
+
+            message = self._cached_get(msg_id, params, history_id=history_id)
+            parsed = self._build_message(message, metadata_only)
+
+            with self._parsed_lock:
+                self._parsed[key] = parsed
+                self._parsed.move_to_end(key)
+                if len(self._parsed) > PARSED_CACHE_SIZE:
+                    self._parsed.popitem(last=False)
 
-    def _get_body(self, payload: Dict, mime_type: str) -> str:
+            return parsed
+
+        except REQUEST_ERRORS as e:
+            logger.error("Error getting message %s: %s", msg_id, e)
+            return None
+
+    def _cached_get(
+        self,
+        msg_id: str,
+        params: Dict,
+        http=None,
+        history_id: Optional[str] = None
+    ) -> Dict:
         """
-        Extract email body by MIME type.
+        Fetch one message response, using the cache when available.
 
         Args:
-            payload: Message payload
-            mime_type: MIME type to extract (text/plain or text/html)
+            msg_id: Message ID
+            params: Parameters for messages().get() (must include format)
+            http: Optional HTTP transport to execute the request with
+            history_id: Expected history ID; a cached response with a
+                different one is fetched again and overwritten
 
         Returns:
-            Decoded body content
-        """
-        if 'parts' in payload:
-            # Multipart message
-            for part in payload['parts']:
-                if part['mimeType'] == mime_type:
-                    if 'data' in part['body']:
-                        return base64.urlsafe_b64decode(
-                            part['body']['data']
-                        ).decode('utf-8', errors='ignore')
-                # Check nested parts
-                if 'parts' in part:
-                    body = self._get_body(part, mime_type)
-                    if body:
-                        return body
-        else:
-            # Single part message
-            if payload.get('mimeType') == mime_type:
-                if 'data' in payload.get('body', {}):
-                    return base64.urlsafe_b64decode(
-                        payload['body']['data']
-                    ).decode('utf-8', errors='ignore')
+            Raw API response
+        """
+        cached = self._cached_response(msg_id, params, history_id)
+        if cached is not None:
+            return cached
 
-        return ''
+        message = _execute_with_retry(
+            self.service.users().messages().get(
+                userId='me',
+                id=msg_id,
+                **params
+            ),
+            http=http
+        )
 
-    def _get_inline_images(self, payload: Dict) -> Dict[str, Dict]:
+        self._store_response(msg_id, params, message)
+        return message
+
+    def _build_message(self, message: Dict, metadata_only: bool = False) -> ParsedMessage:
         """
-        Extract inline images (attachments with Content-ID).
+        Parse an API response and fetch its inline image attachments.
 
         Args:
-            payload: Message payload
+            message: Raw message from API
+            metadata_only: Message was fetched without bodies
 
         Returns:
-            Dictionary mapping Content-ID to image data and MIME type
+            ParsedMessage with the extracted fields
         """
-        inline_images = {}
+        parsed = self._parse_message(message, metadata_only)
+        self._fetch_inline_images(parsed.id, parsed.inline_images)
+        return parsed
 
-        def extract_images(part):
-            """Recursively extract images from parts."""
-            # Check if this part has a Content-ID header (inline image)
-            headers = part.get('headers', [])
-            content_id = None
-            for header in headers:
-                if header['name'].lower() == 'content-id':
-                    # Content-ID is usually in format <id>, strip the brackets
-                    content_id = header['value'].strip('<>')
-                    break
-
-            # If this is an inline image, extract it
-            if content_id and part.get('mimeType', '').startswith('image/'):
-                body = part.get('body', {})
-                if 'attachmentId' in body:
-                    # Image data needs to be fetched separately
-                    inline_images[content_id] = {
-                        'attachment_id': body['attachmentId'],
-                        'mime_type': part['mimeType'],
-                        'data': None  # Will be fetched on demand
-                    }
-                elif 'data' in body:
-                    # Image data is directly available
-                    inline_images[content_id] = {
-                        'data': body['data'],  # Already base64 encoded
-                        'mime_type': part['mimeType']
-                    }
-
-            # Recursively check nested parts
-            if 'parts' in part:
-                for nested_part in part['parts']:
-                    extract_images(nested_part)
-
-        # Start extraction from payload
-        if 'parts' in payload:
-            for part in payload['parts']:
-                extract_images(part)
-        else:
-            extract_images(payload)
+    def _fetch_inline_images(self, msg_id: str, inline_images: Dict[str, Dict]):
+        """
+        Fill in data for inline images stored as separate attachments.
 
-        return inline_images
+        Images not in the cache are fetched in a single batch request.
+        Images that cannot be fetched are reported and keep data None, so
+        the message itself is still returned.
+
+        Args:
+            msg_id: Message ID
+            inline_images: Inline images from _get_inline_images, updated in place
+        """
+        pending = self._pending_inline_images(inline_images)
+        if not pending:
+            return
+
+        keys = {self._attachment_key(msg_id, cid): cid for cid in pending}
+        attachments = {}
+        if self.cache is not None:
+            attachments = self.cache.get_many(keys, 'attachment')
+
+        fetched = self._execute_batch({
+            key: self.service.users().messages().attachments().get(
+                userId='me',
+                messageId=msg_id,
+                id=inline_images[cid]['attachment_id']
+            )
+            for key, cid in keys.items()
+            if key not in attachments
+        })
+
+        if self.cache is not None and fetched:
+            self.cache.set_many('attachment', fetched.items())
+
+        attachments.update(fetched)
+        for key, cid in keys.items():
+            attachment = attachments.get(key)
+            if attachment is None:
+                logger.error("Inline image %s of message %s could not be fetched", cid, msg_id)
+                continue
+            inline_images[cid]['data'] = attachment['data']
 
     def get_attachment(self, msg_id: str, attachment_id: str) -> Optional[str]:
         """
@@ -240,22 +1044,26 @@ class GmailClient:
             Base64-encoded attachment data
         """
         try:
-            attachment = self.service.users().messages().attachments().get(
-                userId='me',
-                messageId=msg_id,
-                id=attachment_id
-            ).execute()
+            attachment = _execute_with_retry(
+                self.service.users().messages().attachments().get(
+                    userId='me',
+                    messageId=msg_id,
+                    id=attachment_id
+                )
+            )
 
             return attachment['data']
 
-        except Exception as e:
-            print(f"Error getting attachment {attachment_id}: {e}")
+        except REQUEST_ERRORS as e:
+            logger.error("Error getting attachment %s: %s", attachment_id, e)
             return None
 
     def get_raw_message(self, msg_id: str) -> Optional[bytes]:
         """
         Get raw RFC822 format message.
 
+        Safe to call from worker threads.
+
         Args:
             msg_id: Message ID
 
@@ -263,14 +1071,44 @@ class GmailClient:
             Raw message bytes suitable for .eml file
         """
         try:
-            message = self.service.users().messages().get(
-                userId='me',
-                id=msg_id,
-                format='raw'
-            ).execute()
+            message = self._cached_get(
+                msg_id,
+                {'format': 'raw', 'fields': RAW_FIELDS},
+                http=self._thread_http()
+            )
 
-            return base64.urlsafe_b64decode(message['raw'])
+            return urlsafe_b64decode(message['raw'])
 
-        except Exception as e:
-            print(f"Error getting raw message {msg_id}: {e}")
+        except REQUEST_ERRORS as e:
+            logger.error("Error getting raw message %s: %s", msg_id, e)
             return None
+
+    def export_raw_batch(self, msg_ids: List[str], out_dir: str = 'downloads') -> List[str]:
+        """
+        Save raw RFC822 messages straight to .eml files.
+
+        Raw messages are fetched BATCH_SIZE at a time with concurrent
+        batch requests and written out as {id}.eml without being parsed.
+
+        Args:
+            msg_ids: Message IDs to export
+            out_dir: Directory to save .eml files
+
+        Returns:
+            List of saved file paths
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        saved_files = []
+
+        for chunk, responses in self._batch_get_chunks(
+                msg_ids, format='raw', fields=RAW_FIELDS):
+            for msg_id in chunk:
+                response = responses.get(msg_id)
+                if not response:
+                    continue
+                filepath = os.path.join(out_dir, f"{msg_id}.eml")
+                with open(filepath, 'wb') as f:
+                    f.write(urlsafe_b64decode(response['raw']))
+                saved_files.append(filepath)
+
+        return saved_files